@@ -1,8 +1,10 @@
 import asyncio
 import os
 import re
+from contextlib import AsyncExitStack
 from typing import Optional
 
+import aiohttp
 from claude_agent_sdk import AssistantMessage, ClaudeAgentOptions, TextBlock, query
 from dotenv import load_dotenv
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
@@ -14,7 +16,19 @@ load_dotenv()
 # Initialize Slack app with WebSocket mode
 app = AsyncApp(token=os.environ.get("SLACK_BOT_TOKEN"))
 
+# Directory holding the agent definitions and docs the Claude agent works from
+_PROJECT_DIR = os.path.join(os.getcwd(), "project")
+
 _user_name_cache: dict[str, str] = {}
+_pending_user_lookups: dict[str, asyncio.Task[str]] = {}
+# Cap concurrent users.info calls so threads with many authors stay within
+# Slack's rate limits instead of firing every lookup at once
+_users_info_limit = asyncio.Semaphore(10)
+
+# Markdown patterns applied to every Claude reply before posting to Slack
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_HEADING_RE = re.compile(r"^#{1,3} (.*?)$", re.MULTILINE)
+_LIST_ITEM_RE = re.compile(r"^- ", re.MULTILINE)
 
 
 async def get_user_display_name(user_id: Optional[str]) -> str:
@@ -26,24 +40,62 @@ async def get_user_display_name(user_id: Optional[str]) -> str:
     if cached:
         return cached
 
+    # Concurrent events in the same thread share a single users.info call
+    lookup = _pending_user_lookups.get(user_id)
+    if lookup is None:
+        lookup = asyncio.create_task(fetch_user_display_name(user_id))
+        _pending_user_lookups[user_id] = lookup
+        lookup.add_done_callback(lambda _: _pending_user_lookups.pop(user_id, None))
+
+    # Shield so one cancelled caller does not cancel the lookup for the others
+    return await asyncio.shield(lookup)
+
+
+async def fetch_user_display_name(user_id: str) -> str:
+    """Look up a Slack user's display name via users.info and cache it."""
     try:
-        response = await app.client.users_info(user=user_id)
+        async with _users_info_limit:
+            response = await app.client.users_info(user=user_id)
     except Exception as exc:  # pragma: no cover - network failure handled gracefully
         print(f"Failed to fetch user profile for {user_id}: {exc}")
         return user_id
 
-    user_payload = response.get("user", {})
-    profile = user_payload.get("profile", {})
+    display_name = user_display_name(response.get("user", {})) or user_id
+
+    _user_name_cache[user_id] = display_name
+    return display_name
+
 
-    display_name = (
+def user_display_name(user_payload: dict) -> Optional[str]:
+    """Pick the most readable name from a Slack user object."""
+    profile = user_payload.get("profile", {})
+    return (
         profile.get("display_name")
         or profile.get("real_name")
         or user_payload.get("name")
-        or user_id
     )
 
-    _user_name_cache[user_id] = display_name
-    return display_name
+
+async def warm_user_name_cache() -> None:
+    """Prefetch workspace display names so thread transcripts hit the cache"""
+    cursor = None
+    try:
+        while True:
+            response = await app.client.users_list(cursor=cursor, limit=200)
+            for member in response.get("members", []):
+                user_id = member.get("id")
+                display_name = user_display_name(member)
+                if user_id and display_name:
+                    _user_name_cache.setdefault(user_id, display_name)
+
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                break
+    except Exception as exc:  # pragma: no cover - warmup is best effort
+        print(f"Failed to warm user name cache: {exc}")
+        return
+
+    print(f"Cached {len(_user_name_cache)} user names")
 
 
 def is_bot_message(msg: dict) -> bool:
@@ -58,15 +110,13 @@ def is_bot_message(msg: dict) -> bool:
 def convert_markdown_to_slack(text: str) -> str:
     """Convert standard markdown formatting to Slack-compatible formatting"""
     # Convert **bold** to *bold* (Slack uses single asterisks for bold)
-    text = re.sub(r"\*\*(.*?)\*\*", r"*\1*", text)
+    text = _BOLD_RE.sub(r"*\1*", text)
 
-    # Convert ### headings to bold text with line breaks
-    text = re.sub(r"^### (.*?)$", r"*\1*", text, flags=re.MULTILINE)
-    text = re.sub(r"^## (.*?)$", r"*\1*", text, flags=re.MULTILINE)
-    text = re.sub(r"^# (.*?)$", r"*\1*", text, flags=re.MULTILINE)
+    # Convert #, ## and ### headings to bold text in a single pass
+    text = _HEADING_RE.sub(r"*\1*", text)
 
     # Convert - list items to • (bullet points)
-    text = re.sub(r"^- (.*?)$", r"• \1", text, flags=re.MULTILINE)
+    text = _LIST_ITEM_RE.sub("• ", text)
 
     # Preserve code blocks (triple backticks work in Slack)
     # No changes needed for ```code``` blocks
@@ -95,7 +145,9 @@ async def fetch_thread_messages(channel: str, thread_ts: str) -> list[dict]:
     human_messages: list[dict] = []
     unresolved_user_ids: list[str] = []
     for msg in messages:
-        if is_bot_message(msg):
+        # Drop bot posts and messages without visible text up front so their
+        # authors are never looked up
+        if is_bot_message(msg) or not msg.get("text", "").strip():
             continue
 
         human_messages.append(msg)
@@ -104,15 +156,22 @@ async def fetch_thread_messages(channel: str, thread_ts: str) -> list[dict]:
         profile_name = profile.get("display_name") or profile.get("real_name")
         if profile_name:
             msg["user_label"] = profile_name
+            # Remember it so the author's messages without a profile skip users.info
+            if msg.get("user"):
+                _user_name_cache.setdefault(msg["user"], profile_name)
             continue
 
         user_id = msg.get("user")
         if user_id:
+            cached = _user_name_cache.get(user_id)
+            if cached:
+                msg["user_label"] = cached
+                continue
             unresolved_user_ids.append(user_id)
         else:
             msg["user_label"] = msg.get("bot_id") or "unknown"
 
-    unique_user_ids = list({uid for uid in unresolved_user_ids})
+    unique_user_ids = list(dict.fromkeys(unresolved_user_ids))
     if unique_user_ids:
         resolved_labels = await asyncio.gather(
             *(get_user_display_name(user_id) for user_id in unique_user_ids)
@@ -149,31 +208,11 @@ def format_thread_messages(messages: list[dict]) -> str:
         formatted.append(f"{user_label}: {text}")
 
     final = "\n".join(formatted)
-    print(f"Formatted thread messages:\n{final}")
+    print(f"Formatted thread messages:\n{final:.200}")
     return final
 
 
-async def process_with_claude(prompt: str, thread_context: Optional[str] = None) -> str:
-    """Process message with Claude agent and return response"""
-    if thread_context:
-        composed_prompt = (
-            f"Thread transcript:\n{thread_context}\n\n"
-            f"{prompt}"
-        )
-    else:
-        composed_prompt = prompt
-
-    print(
-        "Processing with Claude: "
-        f"{'[thread context included]' if thread_context else composed_prompt}"
-    )
-
-    response_text = ""
-    async for message in query(
-        prompt=composed_prompt,
-        options=ClaudeAgentOptions(
-            allowed_tools=[],
-            system_prompt="""
+_SYSTEM_PROMPT = """
 You are Myla, a professional facilitator.
 You work in Slack as a bot. Be concise.
 Your purpose is to **help human teammates reach clear, collaborative decisions** during technical and product discussions.
@@ -259,18 +298,44 @@ When posting in **mediation mode** (conversation still active):
 > Here’s what the facts say — the bug is a P0, and the refactor is scoped as high priority.
 > We can balance both by doing the hooks-only refactor this sprint and Redux next sprint.
 > That gets us stability without derailing delivery.
-""".strip(),
-            model="claude-haiku-4-5-20251001",
-            cwd=os.path.join(os.getcwd(), "project"),
-            setting_sources=["project"],
-        ),
+""".strip()
+
+# Options are identical for every request, so build them once
+_CLAUDE_OPTIONS = ClaudeAgentOptions(
+    allowed_tools=[],
+    system_prompt=_SYSTEM_PROMPT,
+    model="claude-haiku-4-5-20251001",
+    cwd=_PROJECT_DIR,
+    setting_sources=["project"],
+)
+
+
+async def process_with_claude(prompt: str, thread_context: Optional[str] = None) -> str:
+    """Process message with Claude agent and return response"""
+    if thread_context:
+        composed_prompt = (
+            f"Thread transcript:\n{thread_context}\n\n"
+            f"{prompt}"
+        )
+    else:
+        composed_prompt = prompt
+
+    print(
+        "Processing with Claude: "
+        f"{'[thread context included]' if thread_context else composed_prompt}"
+    )
+
+    response_parts: list[str] = []
+    async for message in query(
+        prompt=composed_prompt,
+        options=_CLAUDE_OPTIONS,
     ):
         if isinstance(message, AssistantMessage):
             for block in message.content:
                 if isinstance(block, TextBlock):
-                    response_text += block.text
+                    response_parts.append(block.text)
 
-    return response_text
+    return "".join(response_parts)
 
 
 @app.message(".*")
@@ -336,7 +401,7 @@ async def handle_app_mention(event, say):
 
         # Convert markdown formatting to Slack format
         formatted_response = convert_markdown_to_slack(claude_response)
-        print(f"Claude response: {formatted_response}")
+        print(f"Claude response: {formatted_response:.200}")
 
         # Send response back to Slack as a threaded reply
         reply_thread_ts = thread_ts or event["ts"]
@@ -352,8 +417,24 @@ async def start_slack_bot():
     # For testing purposes
     # response = await process_with_claude("What's our current sprint status?")
     # print(f"Claude response: {response}")
-    handler = AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
-    await handler.start_async()
+    # Everything opened here is unwound in reverse order on shutdown
+    async with AsyncExitStack() as stack:
+        # Share one HTTP session across Web API calls so connections are reused;
+        # without it slack_sdk opens and tears down a session per request
+        app.client.session = await stack.enter_async_context(
+            aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=app.client.timeout)
+            )
+        )
+
+        handler = AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
+        stack.push_async_callback(handler.close_async)
+
+        # Fill the user name cache in the background while the socket connects
+        warmup = asyncio.create_task(warm_user_name_cache())
+        stack.callback(warmup.cancel)
+
+        await handler.start_async()
 
 
 def main():
@@ -368,8 +449,16 @@ def main():
         print("Error: SLACK_APP_TOKEN environment variable is required")
         return
 
+    # Run on uvloop when it is installed; the bot is almost entirely socket I/O
+    try:
+        import uvloop
+    except ImportError:
+        loop_factory = None
+    else:
+        loop_factory = uvloop.new_event_loop
+
     print("Connecting to Slack via WebSocket...")
-    asyncio.run(start_slack_bot())
+    asyncio.run(start_slack_bot(), loop_factory=loop_factory)
 
 
 if __name__ == "__main__":